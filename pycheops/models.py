@@ -29,10 +29,10 @@ from __future__ import (absolute_import, division, print_function,
 import numpy as np
 from lmfit.model import Model
 from lmfit.models import COMMON_INIT_DOC, COMMON_GUESS_DOC
-from numba import jit
+from numba import jit, prange
 from .funcs import t2z, xyz_planet, vrad
+from math import atan2, degrees
 from warnings import warn
-from scipy.optimize import brent, brentq
 from collections import OrderedDict
 from asteval import Interpreter, get_ast_names, valid_symbol_name
 
@@ -41,8 +41,113 @@ __all__ = ['qpower2', 'ueclipse', 'TransitModel', 'EclipseModel',
            'RVModel', 'RVCompanion', 
            'scaled_transit_fit', 'minerr_transit_fit']
 
-@jit(nopython=True)
-def qpower2(z,k,c,a):
+@jit(nopython=True, nogil=True, parallel=True, fastmath=True, cache=True,
+        boundscheck=False)
+def _qpower2_disc(z1, k, c, a):
+    # Flux for points with the planet entirely on the stellar disc.
+    # Straight-line kernel with no branches over a contiguous array so
+    # that the compiler can auto-vectorize the loop.
+    I_0 = (a+2)/(np.pi*(a-c*a+2))
+    g = 0.5*a
+    # loop-invariant scalars
+    gm1 = g-1
+    gm2 = g-2
+    am1 = a-1
+    k2 = k*k
+    I0_pik2 = I_0*np.pi*k2
+    quarter_k2 = 0.25*k2
+    eighth_ack2 = 0.125*a*c*k2
+    f = np.empty_like(z1)
+    # Specialize the s**g, s**(g-1), s**(g-2) evaluations on the value of
+    # a - pow() is the most expensive call in the loop and for the common
+    # cases a=1 (g=1/2) and a=2 (g=1) it reduces to sqrt/divide. In the
+    # generic case one log + three exp replaces three pow calls, and
+    # exp/log (unlike pow) vectorize under fastmath.
+    if a == 1.0:
+        for i in prange(len(z1)):
+            zt = z1[i]
+            s = 1-zt*zt
+            s_g = np.sqrt(s)
+            s_gm1 = 1/s_g
+            s_gm2 = s_gm1/s
+            c0 = (1-c+c*s_g)
+            c2 = 0.5*a*c*s_gm2*(am1*zt*zt-1)
+            f[i] = 1-I0_pik2*(c0 + quarter_k2*c2 - eighth_ack2*s_gm1)
+    elif a == 2.0:
+        for i in prange(len(z1)):
+            zt = z1[i]
+            s = 1-zt*zt
+            s_gm2 = 1/s
+            c0 = (1-c+c*s)
+            c2 = 0.5*a*c*s_gm2*(am1*zt*zt-1)
+            f[i] = 1-I0_pik2*(c0 + quarter_k2*c2 - eighth_ack2)
+    else:
+        for i in prange(len(z1)):
+            zt = z1[i]
+            s = 1-zt*zt
+            log_s = np.log(s)
+            c0 = (1-c+c*np.exp(g*log_s))
+            c2 = 0.5*a*c*np.exp(gm2*log_s)*(am1*zt*zt-1)
+            f[i] = 1-I0_pik2*(c0 + quarter_k2*c2 -
+                    eighth_ack2*np.exp(gm1*log_s))
+    return f
+
+@jit(nopython=True, nogil=True, parallel=True, fastmath=True, cache=True,
+        boundscheck=False)
+def _qpower2_edge(z2, k, c, a):
+    # Flux for points in ingress/egress. As for _qpower2_disc, the loop
+    # body is branch-free (min/max compile to vector min/max, not jumps).
+    I_0 = (a+2)/(np.pi*(a-c*a+2))
+    g = 0.5*a
+    # loop-invariant scalars
+    gm1 = g-1
+    gm2 = g-2
+    gp05 = g+0.5
+    am1 = a-1
+    ac = a*c
+    k2 = k*k
+    k4 = k2*k2
+    f = np.empty_like(z2)
+    for i in prange(len(z2)):
+        zt = z2[i]
+        d = (zt*zt - k2 + 1)/(2*zt)
+        ra = 0.5*(zt-k+d)
+        rb = 0.5*(1+d)
+        sa = 1-ra*ra
+        sb = 1-rb*rb
+        q = min(max(-1.,(zt-d)/k),1.)
+        w2 = k2-(d-zt)**2
+        w = np.sqrt(w2)
+        # One log per power base replaces the pow() calls - see
+        # _qpower2_disc. sa and sb are each raised to three exponents.
+        log_sa = np.log(sa)
+        sa_g = np.exp(g*log_sa)
+        sa_gm1 = np.exp(gm1*log_sa)
+        sa_gm2 = np.exp(gm2*log_sa)
+        b0 = 1 - c + c*sa_g
+        b1 = -ac*ra*sa_gm1
+        b2 = 0.5*ac*sa_gm2*(am1*ra*ra-1)
+        a0 = b0 + b1*(zt-ra) + b2*(zt-ra)**2
+        a1 = b1+2*b2*(zt-ra)
+        aq = np.arccos(q)
+        J1 = ( (a0*(d-zt)-(2/3)*a1*w2 +
+            0.25*b2*(d-zt)*(2*(d-zt)**2-k2))*w
+             + (a0*k2 + 0.25*b2*k4)*aq )
+        J2 = ac*sa_gm1*k4*(
+            0.125*aq + (1/12)*q*(q*q-2.5)*np.sqrt(max(0.,1-q*q)) )
+        log_sb = np.log(sb)
+        sb_g = np.exp(g*log_sb)
+        sb_gm1 = np.exp(gm1*log_sb)
+        d0 = 1 - c + c*sb_g
+        d1 = -ac*rb*sb_gm1
+        K1 = ((d0-rb*d1)*np.arccos(d) +
+                ((rb*d+(2/3)*(1-d*d))*d1 - d*d0) *
+                np.sqrt(max(0.,1-d*d)) )
+        K2 = (1/3)*c*a*np.exp(gp05*log_sb)*(1-d)
+        f[i] = 1 - I_0*(J1 - J2 + K1 - K2)
+    return f
+
+def qpower2(z,k,c,a,mask=None):
     r"""
     Fast and accurate transit light curves for the power-2 limb-darkening law
 
@@ -56,11 +161,13 @@ def qpower2(z,k,c,a):
     .. [1] Maxted, P.F.L. & Gill, S., 2019, accepted for publication in A&A.
 
     :param z: star-planet separation on the sky cf. star radius (array)
-    :param k: planet-star radius ratio (scalar, k<1) 
+    :param k: planet-star radius ratio (scalar, k<1)
     :param c: power-2 limb darkening coefficient
     :param a: power-2 limb darkening exponent
+    :param mask: True for samples where the planet is behind the star, so
+        the flux is 1 irrespective of z (optional boolean array)
 
-    :returns: light curve (observed flux)  
+    :returns: light curve (observed flux)
 
     :Example:
     >>> from pycheops.models import qpower2
@@ -83,47 +190,57 @@ def qpower2(z,k,c,a):
     >>> plt.show()
 
     """
+    # No-op for the contiguous float64 arrays produced by t2z; guarantees
+    # the compiled kernels see unit-stride double-precision data whatever
+    # the caller passes in
+    z = np.ascontiguousarray(z, dtype=np.float64)
     f = np.ones_like(z)
-    I_0 = (a+2)/(np.pi*(a-c*a+2))
-    g = 0.5*a
-    for i,zi in enumerate(z):
-        zt = np.abs(zi)
-        if zt <= (1-k):
-            s = 1-zt**2
-            c0 = (1-c+c*s**g)
-            c2 = 0.5*a*c*s**(g-2)*((a-1)*zt**2-1)
-            f[i] = 1-I_0*np.pi*k**2*(
-                    c0 + 0.25*k**2*c2 - 0.125*a*c*k**2*s**(g-1) )
-        elif np.abs(zt-1) < k:
-            d = (zt**2 - k**2 + 1)/(2*zt)
-            ra = 0.5*(zt-k+d)
-            rb = 0.5*(1+d)
-            sa = 1-ra**2
-            sb = 1-rb**2
-            q = min(max(-1.,(zt-d)/k),1.)
-            w2 = k**2-(d-zt)**2
-            w = np.sqrt(w2)
-            b0 = 1 - c + c*sa**g
-            b1 = -a*c*ra*sa**(g-1)
-            b2 = 0.5*a*c*sa**(g-2)*((a-1)*ra**2-1)
-            a0 = b0 + b1*(zt-ra) + b2*(zt-ra)**2
-            a1 = b1+2*b2*(zt-ra)
-            aq = np.arccos(q)
-            J1 = ( (a0*(d-zt)-(2/3)*a1*w2 + 
-                0.25*b2*(d-zt)*(2*(d-zt)**2-k**2))*w
-                 + (a0*k**2 + 0.25*b2*k**4)*aq )
-            J2 = a*c*sa**(g-1)*k**4*(
-                0.125*aq + (1/12)*q*(q**2-2.5)*np.sqrt(max(0.,1-q**2)) )
-            d0 = 1 - c + c*sb**g
-            d1 = -a*c*rb*sb**(g-1)
-            K1 = ((d0-rb*d1)*np.arccos(d) + 
-                    ((rb*d+(2/3)*(1-d**2))*d1 - d*d0) * 
-                    np.sqrt(max(0.,1-d**2)) )
-            K2 = (1/3)*c*a*sb**(g+0.5)*(1-d)
-            f[i] = 1 - I_0*(J1 - J2 + K1 - K2)
+    zt = np.abs(z)
+    m1 = zt <= (1-k)
+    m2 = (~m1) & (np.abs(zt-1) < k)
+    if mask is not None:
+        # Behind-star samples keep f = 1, so drop them before the kernels
+        # rather than pushing them through the regime arithmetic
+        m1 &= ~mask
+        m2 &= ~mask
+    # Fancy indexing gathers each regime into a fresh contiguous array so
+    # the kernels run branch-free over unit-stride data.
+    f[m1] = _qpower2_disc(zt[m1], k, c, a)
+    f[m2] = _qpower2_edge(zt[m2], k, c, a)
     return f
 
-@jit(nopython=True)
+@jit(nopython=True, fastmath=True, cache=True, boundscheck=False)
+def _scaled_transit_fit(flux, sigma, model):
+    # Fused single-pass reductions - one walk through the arrays for the
+    # weighted sums and one for chisq, with no intermediate arrays.
+    N = len(flux)
+    if N < 3:
+        return np.nan, np.nan, np.nan, np.nan
+
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(N):
+        dm = model[i]-1
+        df = flux[i]-1
+        w = 1.0/(sigma[i]*sigma[i])
+        sxx += w*dm*dm
+        sxy += w*dm*df
+    if sxx == 0:
+        return np.nan, np.nan, np.nan, np.nan
+    s = sxy/sxx
+    chisq = 0.0
+    for i in range(N):
+        r = (flux[i]-1) - s*(model[i]-1)
+        chisq += r*r/(sigma[i]*sigma[i])
+    b = np.sqrt(chisq/N)
+    sigma_s = b/np.sqrt(sxx)
+    _t = 3*chisq/b**4 - N/b**2
+    if _t > 0:
+        sigma_b = 1/np.sqrt(_t)
+    else:
+        return np.nan, np.nan, np.nan, np.nan
+    return s, b, sigma_s, sigma_b
+
 def scaled_transit_fit(flux, sigma, model):
     """
     Optimum scaled transit depth for data with scaled errors
@@ -143,25 +260,178 @@ def scaled_transit_fit(flux, sigma, model):
      :returns: s, b, sigma_s, sigma_b
 
     """
-    N = len(flux)
-    if N < 3:
-        return np.nan, np.nan, np.nan, np.nan
-
-    w = 1/sigma**2
-    _m = np.sum(w*(model-1)**2)
-    if _m == 0:
-        return np.nan, np.nan, np.nan, np.nan
-    s = np.sum(w*(model-1)*(flux-1))/_m
-    chisq = np.sum(w*((flux-1)-s*(model-1))**2)
-    b = np.sqrt(chisq/N)
-    sigma_s = b/np.sqrt(_m)
-    _t = 3*chisq/b**4 - N/b**2 
-    if _t > 0:
-        sigma_b = 1/np.sqrt(_t)
+    flux = np.asarray(flux, dtype=np.float64)
+    model = np.asarray(model, dtype=np.float64)
+    # Present scalar sigma to the kernel as a broadcast view so the fused
+    # loops can index it without allocating a full-size copy
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=np.float64), flux.shape)
+    return _scaled_transit_fit(flux, sigma, model)
+
+
+_EPS = np.finfo(0.0).eps
+
+@jit(nopython=True, fastmath=True, cache=True, boundscheck=False)
+def _nll_kernel(s, dm, inv_sigma, flux_m1):
+    # Negative log-likelihood for the scaled model 1 + s*dm, with dm,
+    # flux_m1 and inv_sigma precomputed by the caller. Single fused pass,
+    # no intermediate arrays.
+    log_half = np.log(0.5)
+    acc = 0.0
+    for i in range(len(dm)):
+        r = (s*dm[i] - flux_m1[i])*inv_sigma[i]
+        Rsq = r*r
+        # log((1-exp(-y))/y) = log(-expm1(-y)/y), and expm1 is accurate
+        # near zero, so only Rsq = 0 itself needs the log(0.5) limit
+        if Rsq > 0:
+            acc -= np.log(-np.expm1(-0.5*Rsq)/Rsq)
+        else:
+            acc -= log_half
+    return acc
+
+@jit(nopython=True, cache=True, boundscheck=False)
+def _nll_brent_min(xa, xb, xc, dm, inv_sigma, flux_m1):
+    # Brent minimization of _nll_kernel over the bracket (xa, xb, xc).
+    # Same algorithm and tolerances as scipy.optimize.brent, but compiled
+    # so each likelihood evaluation avoids the Python callback dispatch.
+    # Returns (xmin, fmin).
+    _cg = 0.3819660
+    _mintol = 1.0e-11
+    tol = 1.48e-8
+    x = w = v = xb
+    fx = fw = fv = _nll_kernel(x, dm, inv_sigma, flux_m1)
+    if xa < xc:
+        a, b = xa, xc
     else:
-        return np.nan, np.nan, np.nan, np.nan
-    return s, b, sigma_s, sigma_b
-
+        a, b = xc, xa
+    deltax = 0.0
+    rat = 0.0
+    for _ in range(500):
+        tol1 = tol*np.abs(x) + _mintol
+        tol2 = 2.0*tol1
+        xmid = 0.5*(a + b)
+        if np.abs(x - xmid) < (tol2 - 0.5*(b - a)):
+            break
+        if np.abs(deltax) <= tol1:
+            # golden section step
+            if x >= xmid:
+                deltax = a - x
+            else:
+                deltax = b - x
+            rat = _cg*deltax
+        else:
+            # parabolic step
+            tmp1 = (x - w)*(fx - fv)
+            tmp2 = (x - v)*(fx - fw)
+            p = (x - v)*tmp2 - (x - w)*tmp1
+            tmp2 = 2.0*(tmp2 - tmp1)
+            if tmp2 > 0.0:
+                p = -p
+            tmp2 = np.abs(tmp2)
+            dx_temp = deltax
+            deltax = rat
+            if ((p > tmp2*(a - x)) and (p < tmp2*(b - x)) and
+                    (np.abs(p) < np.abs(0.5*tmp2*dx_temp))):
+                rat = p/tmp2
+                u = x + rat
+                if (u - a) < tol2 or (b - u) < tol2:
+                    if xmid - x >= 0:
+                        rat = tol1
+                    else:
+                        rat = -tol1
+            else:
+                # parabolic step not useful, fall back to golden section
+                if x >= xmid:
+                    deltax = a - x
+                else:
+                    deltax = b - x
+                rat = _cg*deltax
+        if np.abs(rat) < tol1:
+            if rat >= 0:
+                u = x + tol1
+            else:
+                u = x - tol1
+        else:
+            u = x + rat
+        fu = _nll_kernel(u, dm, inv_sigma, flux_m1)
+        if fu > fx:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if (fu <= fw) or (w == x):
+                v, w = w, u
+                fv, fw = fw, fu
+            elif (fu <= fv) or (v == x) or (v == w):
+                v = u
+                fv = fu
+        else:
+            if u >= x:
+                a = x
+            else:
+                b = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+    return x, fx
+
+@jit(nopython=True, cache=True, boundscheck=False)
+def _nll_brentq_root(xa, xb, loglike_0, dm, inv_sigma, flux_m1):
+    # Brent root-finding for loglike_0 + _nll_kernel(s) = 0 on [xa, xb].
+    # Same algorithm and tolerances as scipy.optimize.brentq.
+    xtol = 2.0e-12
+    rtol = 4*_EPS
+    xpre, xcur = xa, xb
+    fpre = loglike_0 + _nll_kernel(xpre, dm, inv_sigma, flux_m1)
+    fcur = loglike_0 + _nll_kernel(xcur, dm, inv_sigma, flux_m1)
+    if fpre*fcur > 0:
+        raise ValueError("f(a) and f(b) must have different signs")
+    if fpre == 0:
+        return xpre
+    if fcur == 0:
+        return xcur
+    xblk = 0.0
+    fblk = 0.0
+    spre = 0.0
+    scur = 0.0
+    for _ in range(100):
+        if fpre*fcur < 0:
+            xblk = xpre
+            fblk = fpre
+            spre = scur = xcur - xpre
+        if np.abs(fblk) < np.abs(fcur):
+            xpre, xcur = xcur, xblk
+            xblk = xpre
+            fpre, fcur = fcur, fblk
+            fblk = fpre
+        delta = (xtol + rtol*np.abs(xcur))/2
+        sbis = (xblk - xcur)/2
+        if fcur == 0 or np.abs(sbis) < delta:
+            return xcur
+        if np.abs(spre) > delta and np.abs(fcur) < np.abs(fpre):
+            if xpre == xblk:
+                # secant interpolation
+                stry = -fcur*(xcur - xpre)/(fcur - fpre)
+            else:
+                # inverse quadratic extrapolation
+                dpre = (fpre - fcur)/(xpre - xcur)
+                dblk = (fblk - fcur)/(xblk - xcur)
+                stry = -fcur*(fblk - fpre)/(fblk*dpre - fpre*dblk)
+            if 2*np.abs(stry) < min(np.abs(spre), 3*np.abs(sbis) - delta):
+                spre = scur
+                scur = stry
+            else:
+                spre = sbis
+                scur = sbis
+        else:
+            spre = sbis
+            scur = sbis
+        xpre = xcur
+        fpre = fcur
+        if np.abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = loglike_0 + _nll_kernel(xcur, dm, inv_sigma, flux_m1)
+    return xcur
 
 def minerr_transit_fit(flux, sigma, model):
     """
@@ -193,83 +463,161 @@ def minerr_transit_fit(flux, sigma, model):
     if N < 3:
         return np.nan, np.nan
 
-    def _negloglike(s, flux, sigma, model):
-        model =  1 + s*(model-1)
-        Rsq = ((model-flux)/sigma)**2
-        # In the limit Rsq -> 0, log-likelihood -> log(0.5)
-        x = np.full_like(Rsq,np.log(0.5))
-        _j = Rsq > np.finfo(0.0).eps
-        x[_j] = np.log((1-np.exp(-0.5*Rsq[_j]))/Rsq[_j])
-        return -np.sum(x)
+    # Spot-check a few samples before paying for the full reduction -
+    # a trial model with no transit is rare inside a fit loop
+    if (model[len(model)//2] == 1 and model[0] == 1 and model[-1] == 1
+            and np.min(model) == 1):
+        return 0,0
 
-    def _loglikediff(s, loglike_0, flux, sigma, model):
-        return loglike_0 + _negloglike(s, flux, sigma, model)
+    # Hoist the quantities that are constant over the 1-D searches so
+    # that each likelihood evaluation is a single pass in _nll_kernel
+    flux = np.asarray(flux, dtype=np.float64)
+    dm = np.asarray(model, dtype=np.float64) - 1
+    flux_m1 = flux - 1
+    inv_sigma = np.broadcast_to(1/np.asarray(sigma, dtype=np.float64),
+            flux.shape)
 
-    if np.min(model) == 1:
-        return 0,0
-    # Bracket the minimum of _negloglike
+    # Bracket the minimum of the negative log-likelihood
     s_min = 0
-    fa = _negloglike(s_min, flux, sigma, model)
+    fa = _nll_kernel(s_min, dm, inv_sigma, flux_m1)
     s_mid = 1
-    fb = _negloglike(s_mid, flux, sigma, model)
+    fb = _nll_kernel(s_mid, dm, inv_sigma, flux_m1)
     #print('s_min, fa, s_mid, fb',s_min, fa, s_mid, fb)
     if fb < fa:
         s_max = 2
-        fc = _negloglike(s_max, flux, sigma, model)
+        fc = _nll_kernel(s_max, dm, inv_sigma, flux_m1)
         while fc < fb:
             s_max = 2*s_max
-            fc = _negloglike(s_max, flux, sigma, model)
+            fc = _nll_kernel(s_max, dm, inv_sigma, flux_m1)
     else:
         s_max = s_mid
         fc = fb
         s_mid = 0.5
-        fb = _negloglike(s_mid, flux, sigma, model)
+        fb = _nll_kernel(s_mid, dm, inv_sigma, flux_m1)
         while fb > fa:
             if s_mid < 2**-16:
                 return 0,0
             s_mid = 0.5*s_mid
-            fb = _negloglike(s_mid, flux, sigma, model)
+            fb = _nll_kernel(s_mid, dm, inv_sigma, flux_m1)
 
     #print('s_min, fa, s_mid, fb, s_max, fc',s_min, fa, s_mid, fb, s_max, fc)
-    s_opt, _f, _, _ = brent(_negloglike, args=(flux, sigma, model),
-                       brack=(s_min,s_mid,s_max), full_output=True)
+    s_opt, _f = _nll_brent_min(s_min, s_mid, s_max, dm, inv_sigma, flux_m1)
     loglike_0 = -_f -0.5
     s_hi = s_max
-    f_hi = _loglikediff(s_hi, loglike_0, flux, sigma, model)
+    f_hi = loglike_0 + _nll_kernel(s_hi, dm, inv_sigma, flux_m1)
     while f_hi < 0:
         s_hi = 2*s_hi
-        f_hi = _loglikediff(s_hi, loglike_0, flux, sigma, model)
-    s_hi = brentq(_loglikediff, s_opt, s_hi,
-                 args = (loglike_0, flux, sigma, model))
+        f_hi = loglike_0 + _nll_kernel(s_hi, dm, inv_sigma, flux_m1)
+    s_hi = _nll_brentq_root(s_opt, s_hi, loglike_0, dm, inv_sigma, flux_m1)
     s_err = s_hi - s_opt
     #print('s_opt,  s_err',s_opt, s_err)
     return s_opt, s_err
 
-@jit(nopython=True)
-def ueclipse(z,k):
+def ueclipse(z,k,mask=None):
     """
     Eclipse light curve for a planet with uniform surface brightness by a star
 
     :param z: star-planet separation on the sky cf. star radius (array)
-    :param k: planet-star radius ratio (scalar, k<1) 
+    :param k: planet-star radius ratio (scalar, k<1)
+    :param mask: True for samples where the planet is in front of the star,
+        so the flux is 1 irrespective of z (optional boolean array)
 
-    :returns: light curve (observed flux from eclipsed source)  
+    :returns: light curve (observed flux from eclipsed source)
     """
     if (k > 1):
         raise ValueError("ueclipse requires k < 1")
 
+    z = np.ascontiguousarray(z, dtype=np.float64)
     fl = np.ones_like(z)
-    for i,zi in enumerate(z):
-        zt = np.abs(zi)
-        if zt <= (1-k):
-            fl[i] = 0
-        elif np.abs(zt-1) < k:
-            t1 = np.arccos(min(max(-1,(zt**2+k**2-1)/(2*zt*k)),1))
-            t2 = np.arccos(min(max(-1,(zt**2+1-k**2)/(2*zt)),1))
-            t3 = 0.5*np.sqrt(max(0,(1+k-zt)*(zt+k-1)*(zt-k+1)*(zt+k+1)))
-            fl[i] = 1 - (k**2*t1 + t2 - t3)/(np.pi*k**2)
+    zt = np.abs(z)
+    m_full = zt <= (1-k)
+    m_edge = (~m_full) & (np.abs(zt-1) < k)
+    if mask is not None:
+        m_full &= ~mask
+        m_edge &= ~mask
+    fl[m_full] = 0
+    # Partial eclipse - whole-array ufunc arithmetic over the gathered
+    # contiguous sub-array, with np.clip/np.maximum as domain guards
+    zte = zt[m_edge]
+    t1 = np.arccos(np.clip((zte**2+k**2-1)/(2*zte*k),-1,1))
+    t2 = np.arccos(np.clip((zte**2+1-k**2)/(2*zte),-1,1))
+    t3 = 0.5*np.sqrt(np.maximum(0,(1+k-zte)*(zte+k-1)*(zte-k+1)*(zte+k+1)))
+    fl[m_edge] = 1 - (k**2*t1 + t2 - t3)/(np.pi*k**2)
     return fl
 
+# In a composite model (e.g. TransitModel + EclipseModel) lmfit evaluates
+# each sub-model separately, so the same Keplerian geometry is requested
+# more than once per residual and the Kepler solver inside t2z/xyz_planet
+# dominates the cost. Keep the last few results, keyed on the rounded
+# orbital parameters; each entry also stores the time array it was
+# computed from, and a hit requires that object itself ("cached_t is t")
+# - id()-based keys are unsafe because an id can be recycled once the
+# original array is garbage-collected.
+_GEOM_CACHE = OrderedDict()
+_GEOM_CACHE_SIZE = 4
+
+def _geom_lookup(key, t):
+    try:
+        cached_t, result = _GEOM_CACHE[key]
+    except KeyError:
+        return None
+    if cached_t is not t:
+        return None
+    _GEOM_CACHE.move_to_end(key)
+    return result
+
+def _geom_store(key, t, result):
+    for r in result:
+        r.flags.writeable = False
+    _GEOM_CACHE[key] = (t, result)
+    if len(_GEOM_CACHE) > _GEOM_CACHE_SIZE:
+        _GEOM_CACHE.popitem(last=False)
+    return result
+
+def _cached_t2z(t, tzero, P, sini, rstar, ecc, om):
+    key = ('t2z', round(tzero,12), round(P,12), round(sini,10),
+            round(rstar,12), round(ecc,10), round(om,8))
+    result = _geom_lookup(key, t)
+    if result is None:
+        result = _geom_store(key, t,
+                t2z(t, tzero, P, sini, rstar, ecc, om, returnMask=True))
+    return result
+
+def _cached_xyz_planet(t, tzero, P, sini, ecc, om):
+    key = ('xyz', round(tzero,12), round(P,12), round(sini,10),
+            round(ecc,10), round(om,8))
+    result = _geom_lookup(key, t)
+    if result is None:
+        result = _geom_store(key, t, xyz_planet(t, tzero, P, sini, ecc, om))
+    return result
+
+@jit(nopython=True, cache=True)
+def _star_geom(D, W, S):
+    # Scalar validity checks and derived geometry shared by TransitModel
+    # and EclipseModel, compiled so each model evaluation pays a single
+    # function call instead of ~15 interpreted operations. Returns
+    # (ok, k, sini, r_star); ok is False for invalid parameter values.
+    if D <= 0:
+        return False, 0.0, 0.0, 0.0
+    k = np.sqrt(D)
+    if k > 0.5:
+        return False, 0.0, 0.0, 0.0
+    if (1-S) <= 0:
+        return False, 0.0, 0.0, 0.0
+    bsq = ((1-k)**2 - S*(1+k)**2) / (1-S)
+    if bsq < 0:
+        return False, 0.0, 0.0, 0.0
+    b = np.sqrt(bsq)
+    q = (1+k)**2-bsq
+    if q <= 0:
+        return False, 0.0, 0.0, 0.0
+    r_star = np.pi * W / np.sqrt(q)
+    q = 1 - (b*r_star)**2
+    if q <= 0:
+        return False, 0.0, 0.0, 0.0
+    sini = np.sqrt(q)
+    return True, k, sini, r_star
+
 class TransitModel(Model):
     r"""Light curve model for the transit of a spherical star by an opaque
     spherical body (planet).
@@ -315,40 +663,37 @@ class TransitModel(Model):
         kwargs.update({'prefix': prefix, 'nan_policy': nan_policy,
                        'independent_vars': independent_vars})
 
+        self._ones_cache = (None, None)
+
         def _transit_func(t, T_0, P, D, W, S, f_c, f_s, h_1, h_2):
-            if D <= 0:
-                return np.ones_like(t)
-            k = np.sqrt(D)
-            if k > 0.5:
-                return np.ones_like(t)
-            if (1-S) <= 0:
-                return np.ones_like(t)
-            bsq = ((1-k)**2 - S*(1+k)**2) / (1-S) 
-            if bsq < 0:
-                return np.ones_like(t)
-            b = np.sqrt(bsq)
-            q = (1+k)**2-bsq
-            if q <= 0:
-                return np.ones_like(t)
-            r_star = np.pi * W / np.sqrt(q)
-            q = 1 - (b*r_star)**2
-            if q <= 0:
-                return np.ones_like(t)
-            sini = np.sqrt(q)
+            ok, k, sini, r_star = _star_geom(D, W, S)
+            if not ok:
+                return self._ones(t)
             if (h_1 <= 0) or (h_2 <= 0) or (h_2 > h_1) or (h_1 >= 1):
-                return np.ones_like(t)
+                return self._ones(t)
             c2 = 1 - h_1 + h_2
             a2 = np.log2(c2/h_2)
-            ecc = f_c**2 + f_s**2
-            om = np.arctan2(f_s, f_c)*180/np.pi
-            z,m = t2z(t, T_0, P, sini, r_star, ecc, om, returnMask = True)
-            # Set z values where planet is behind star to a large nominal value
-            z[m]  = 9999
-            return qpower2(z, k, c2, a2)
+            ecc = f_c*f_c + f_s*f_s
+            om = degrees(atan2(f_s, f_c))
+            z,m = _cached_t2z(t, T_0, P, sini, r_star, ecc, om)
+            # The mask flags z values where the planet is behind the star
+            return qpower2(z, k, c2, a2, mask=m)
 
         super(TransitModel, self).__init__(_transit_func, **kwargs)
         self._set_paramhints_prefix()
 
+    def _ones(self, t):
+        # Invalid parameter values are visited many times during a fit, so
+        # re-use a single read-only array of ones per input time array
+        # instead of allocating a fresh one for every early exit.
+        _id, _buf = self._ones_cache
+        if _id == id(t) and len(_buf) == len(t):
+            return _buf
+        _buf = np.ones_like(t)
+        _buf.flags.writeable = False
+        self._ones_cache = (id(t), _buf)
+        return _buf
+
     def _set_paramhints_prefix(self):
         self.set_param_hint('P', min=1e-15)
         self.set_param_hint('D', min=0, max=1)
@@ -409,35 +754,35 @@ class EclipseModel(Model):
         kwargs.update({'prefix': prefix, 'nan_policy': nan_policy,
                        'independent_vars': independent_vars})
 
+        self._ones_cache = (None, None)
+
         def _eclipse_func(t, T_0, P, D, W, S, L, f_c, f_s, a_c):
-            if D <= 0:
-                return np.ones_like(t)
-            k = np.sqrt(D)
-            if k > 0.5:
-                return np.ones_like(t)
-            if (1-S) <= 0:
-                return np.ones_like(t)
-            bsq = ((1-k)**2 - S*(1+k)**2) / (1-S) 
-            if bsq < 0:
-                return np.ones_like(t)
-            b = np.sqrt(bsq)
-            q = (1+k)**2-bsq
-            if q <= 0:
-                return np.ones_like(t)
-            r_star = np.pi * W / np.sqrt(q)
-            q = 1 - (b*r_star)**2
-            if q <= 0:
-                return np.ones_like(t)
-            sini = np.sqrt(q)
-            ecc = f_c**2 + f_s**2
-            om = np.arctan2(f_s, f_c)*180/np.pi
-            z,m = t2z(t-a_c, T_0, P, sini, r_star, ecc, om, returnMask=True)
-            z[~m]  = 9999
-            return 1 + L*(ueclipse(z, k)-1)
+            ok, k, sini, r_star = _star_geom(D, W, S)
+            if not ok:
+                return self._ones(t)
+            ecc = f_c*f_c + f_s*f_s
+            om = degrees(atan2(f_s, f_c))
+            # t2z depends on time only through t - tzero, so the light
+            # travel time correction can be folded into T_0; this keeps t
+            # itself as the cache key instead of a fresh t-a_c array
+            z,m = _cached_t2z(t, T_0+a_c, P, sini, r_star, ecc, om)
+            return 1 + L*(ueclipse(z, k, mask=~m)-1)
 
         super(EclipseModel, self).__init__(_eclipse_func, **kwargs)
         self._set_paramhints_prefix()
 
+    def _ones(self, t):
+        # Invalid parameter values are visited many times during a fit, so
+        # re-use a single read-only array of ones per input time array
+        # instead of allocating a fresh one for every early exit.
+        _id, _buf = self._ones_cache
+        if _id == id(t) and len(_buf) == len(t):
+            return _buf
+        _buf = np.ones_like(t)
+        _buf.flags.writeable = False
+        self._ones_cache = (id(t), _buf)
+        return _buf
+
     def _set_paramhints_prefix(self):
         self.set_param_hint('P', min=1e-15)
         self.set_param_hint('D', min=0, max=1)
@@ -460,6 +805,10 @@ class EclipseModel(Model):
                 expr = "sqrt(((1-{p:s}k)**2-{p:s}S*(1+{p:s}k)**2)/(1-{p:s}S))"
                 .format(p=self.prefix) )
 
+# Order in which detrending terms appear in the FactorModel design matrix
+_FACTOR_TERMS = ('dfdt', 'd2fdt2', 'dfdx', 'd2fdx2', 'dfdy', 'd2fdy2',
+        'd2fdxdy', 'dfdsinphi', 'dfdcosphi', 'dfdsin2phi', 'dfdcos2phi')
+
 class FactorModel(Model):
     """Flux scaling and trend factor model
 
@@ -484,29 +833,77 @@ class FactorModel(Model):
         kwargs.update({'prefix': prefix, 'nan_policy': nan_policy,
                        'independent_vars': independent_vars})
 
+        self._t_cache = None
+        self._basis = None
+        self._design_key = None
+        self._design = None
+
         def factor(t, d2fdt2=0, dfdt=0, dfdcosphi=0, dfdsinphi=0,
                 dfdcos2phi=0, dfdsin2phi=0, d2fdy2=0, d2fdxdy=0, d2fdx2=0,
                 dfdy=0, dfdx=0, c=1.0):
 
-            dt = t - np.median(t)
-            trend = 1 + dfdt*dt + d2fdt2*dt**2
-            if dfdx != 0 or d2fdx2 != 0:
-                trend += dfdx*self.dx(t) + d2fdx2*self.dx(t)**2
-            if dfdy != 0 or d2fdy2 != 0:
-                trend += dfdy*self.dy(t) + d2fdy2*self.dy(t)**2
-            if d2fdxdy != 0 :
-                trend += d2fdxdy*self.dx(t)*self.dy(t)
-            if dfdsinphi != 0 :
-                trend += dfdsinphi*self.sinphi(t)
-            if dfdcosphi != 0 :
-                trend += dfdcosphi*self.cosphi(t)
-            if dfdsin2phi != 0 :
-                sin2phi = 2*self.sinphi(t)*self.cosphi(t)
-                trend += dfdsin2phi*sin2phi
-            if dfdcos2phi != 0 :
-                cos2phi = self.sinphi(t)**2 - self.cosphi(t)**2
-                trend += dfdcos2phi*cos2phi
-            return c*trend
+            # The basis vectors for the trend terms only depend on t,
+            # which is fixed over an lmfit run, so compute them once per
+            # time array. The array object itself is kept and compared by
+            # identity - an id()-based key can be recycled after the
+            # original array is garbage-collected.
+            if t is not self._t_cache:
+                dt = np.asarray(t, dtype=np.float64) - np.median(t)
+                basis = {'dfdt': dt, 'd2fdt2': dt*dt}
+                if self.dx is not None:
+                    dxv = np.asarray(self.dx(t), dtype=np.float64)
+                    basis['dfdx'] = dxv
+                    basis['d2fdx2'] = dxv*dxv
+                if self.dy is not None:
+                    dyv = np.asarray(self.dy(t), dtype=np.float64)
+                    basis['dfdy'] = dyv
+                    basis['d2fdy2'] = dyv*dyv
+                if self.dx is not None and self.dy is not None:
+                    basis['d2fdxdy'] = basis['dfdx']*basis['dfdy']
+                if self.sinphi is not None:
+                    sp = np.asarray(self.sinphi(t), dtype=np.float64)
+                    basis['dfdsinphi'] = sp
+                if self.cosphi is not None:
+                    cp = np.asarray(self.cosphi(t), dtype=np.float64)
+                    basis['dfdcosphi'] = cp
+                if self.sinphi is not None and self.cosphi is not None:
+                    # double-angle identities; the difference of squares
+                    # is factored to save a multiply per sample
+                    basis['dfdsin2phi'] = 2*sp*cp
+                    basis['dfdcos2phi'] = (sp-cp)*(sp+cp)
+                self._t_cache = t
+                self._basis = basis
+                self._design_key = None
+
+            # Specialize to the set of coefficients that are in use - the
+            # design matrix of active basis vectors is rebuilt only when
+            # that set changes, and the trend is then a single dot product
+            coeffs = {'dfdt': dfdt, 'd2fdt2': d2fdt2, 'dfdx': dfdx,
+                    'd2fdx2': d2fdx2, 'dfdy': dfdy, 'd2fdy2': d2fdy2,
+                    'd2fdxdy': d2fdxdy, 'dfdsinphi': dfdsinphi,
+                    'dfdcosphi': dfdcosphi, 'dfdsin2phi': dfdsin2phi,
+                    'dfdcos2phi': dfdcos2phi}
+            active = tuple(p for p in _FACTOR_TERMS if coeffs[p] != 0)
+            for p in active:
+                if p not in self._basis:
+                    if p in ('dfdx', 'd2fdx2'):
+                        raise ValueError("dx function required to use "+p)
+                    if p in ('dfdy', 'd2fdy2'):
+                        raise ValueError("dy function required to use "+p)
+                    if p == 'd2fdxdy':
+                        raise ValueError(
+                                "dx and dy functions required to use "+p)
+                    raise ValueError(
+                            "sinphi and cosphi functions required to use "+p)
+            if active != self._design_key:
+                self._design = (np.vstack([self._basis[p] for p in active])
+                        if active else None)
+                self._design_key = active
+
+            if self._design is None:
+                return np.full_like(self._basis['dfdt'], c)
+            w = np.array([coeffs[p] for p in active])
+            return c*(1 + w @ self._design)
 
         super(FactorModel, self).__init__(factor, **kwargs)
 
@@ -608,9 +1005,9 @@ class ReflectionModel(Model):
                        'independent_vars': independent_vars})
 
         def _reflection(t, T_0, P, A_g, r_p, f_c, f_s, sini):
-            ecc = f_c**2 + f_s**2
-            om = np.arctan2(f_s, f_c)*180/np.pi
-            x,y,z = xyz_planet(t, T_0, P, sini, ecc, om)
+            ecc = f_c*f_c + f_s*f_s
+            om = degrees(atan2(f_s, f_c))
+            x,y,z = _cached_xyz_planet(t, T_0, P, sini, ecc, om)
             r = np.sqrt(x**2+y**2+z**2)
             beta = np.arccos(-z/r)
             Phi_L = (np.sin(beta) + (np.pi-beta)*np.cos(beta) )/np.pi
@@ -649,8 +1046,8 @@ class RVModel(Model):
                        'independent_vars': independent_vars})
 
         def _rv(t, T_0, P, V_0, K, f_c, f_s, sini):
-            ecc = f_c**2 + f_s**2
-            om = np.arctan2(f_s, f_c)*180/np.pi
+            ecc = f_c*f_c + f_s*f_s
+            om = degrees(atan2(f_s, f_c))
             return V_0 + vrad(t, T_0, P, K, ecc, om, sini, primary=True)
 
         super(RVModel, self).__init__(_rv, **kwargs)
@@ -692,8 +1089,8 @@ class RVCompanion(Model):
                        'independent_vars': independent_vars})
 
         def _rv(t, T_0, P, V_0, K, f_c, f_s, sini):
-            ecc = f_c**2 + f_s**2
-            om = np.arctan2(f_s, f_c)*180/np.pi
+            ecc = f_c*f_c + f_s*f_s
+            om = degrees(atan2(f_s, f_c))
             return V_0 + vrad(t, T_0, P, K, ecc, om, sini, primary=False)
 
         super(RVCompanion, self).__init__(_rv, **kwargs)
@@ -713,6 +1110,23 @@ class RVCompanion(Model):
 
     __init__.__doc__ = COMMON_INIT_DOC
 
+# Building an asteval Interpreter populates a large symbol table, so share
+# one instance per usersyms set instead of rebuilding it for every Priors()
+_ASTEVAL_CACHE = {}
+
+def _get_asteval(usersyms=None):
+    if usersyms is None:
+        usersyms = {}
+    try:
+        key = tuple(sorted(usersyms.items()))
+        if key in _ASTEVAL_CACHE:
+            return _ASTEVAL_CACHE[key]
+    except TypeError:
+        # unhashable or unorderable symbol values - private instance
+        return Interpreter(usersyms=usersyms)
+    _ASTEVAL_CACHE[key] = Interpreter(usersyms=usersyms)
+    return _ASTEVAL_CACHE[key]
+
 class Priors(OrderedDict):
     """An ordered dictionary of all the Prior objects required to evaluate the
     log-value of the prior for Bayesian model fitting. 
@@ -735,8 +1149,8 @@ class Priors(OrderedDict):
 
         """
 
-        super(Parameters, self).__init__(self)
-        self._asteval = Interpreter(usersyms=usersyms)
+        super(Priors, self).__init__(self)
+        self._asteval = _get_asteval(usersyms=usersyms)
 
 
 